@@ -5,6 +5,11 @@ import os
 from datetime import datetime
 import requests
 import json
+import tempfile
+import time
+from repeat_failure_monitor import RepeatFailureMonitor
+from diagnostic_report import FORMATS, iter_records, write_reports
+from prompt_builder import PromptBuilder, ResponseCache
 
 st.set_page_config(
     page_title="IBM Metis TestLab Advisor", 
@@ -26,6 +31,10 @@ class WatsonxAIHelper:
         }
         self.current_model = "granite-3-2-8b"
         
+        # Prompt construction and response cache are wired up once data is loaded
+        self.prompt_builder = None
+        self.response_cache = None
+        
     def is_configured(self):
         return bool(self.api_key and self.project_id)
     
@@ -38,16 +47,38 @@ class WatsonxAIHelper:
             return True
         return False
     
-    def generate_diagnostic_analysis(self, refcode, fru_name, symptoms, model_preference=None):
+    def build_prompt(self, row, question, model_preference=None):
+        """Token-budgeted prompt for the selected row (or None) and question"""
+        if self.prompt_builder is None:
+            return None
+        return self.prompt_builder.build(model_preference or self.current_model, row, question)
+    
+    def generate_diagnostic_analysis(self, refcode, fru_name, symptoms, model_preference=None, row=None):
         """Generate AI-powered diagnostic analysis using selected Granite model"""
+        return self.generate_analysis_with_prompt(refcode, fru_name, symptoms, model_preference, row)[0]
+    
+    def generate_analysis_with_prompt(self, refcode, fru_name, symptoms, model_preference=None, row=None):
+        """Analysis plus the BuiltPrompt it was generated from (None if the prompt could not be built)"""
+        try:
+            prompt = self.build_prompt(row, symptoms, model_preference)
+        except ValueError:
+            prompt = None
         if not self.is_configured():
-            return self._mock_analysis(refcode, fru_name, symptoms, model_preference)
+            return self._mock_analysis(refcode, fru_name, symptoms, model_preference), prompt
         
         try:
-            # Real watsonx.ai API call would go here
-            return self._mock_analysis(refcode, fru_name, symptoms, model_preference)
+            cacheable = prompt is not None and self.response_cache is not None
+            if cacheable:
+                cached = self.response_cache.get(prompt.cache_key)
+                if cached is not None:
+                    return cached, prompt
+            # Real watsonx.ai API call would go here, sending prompt.text
+            response = self._mock_analysis(refcode, fru_name, symptoms, model_preference)
+            if cacheable:
+                self.response_cache.put(prompt.cache_key, response)
+            return response, prompt
         except Exception as e:
-            return f"AI analysis unavailable: {str(e)}"
+            return f"AI analysis unavailable: {str(e)}", prompt
     
     def _mock_analysis(self, refcode, fru_name, symptoms, model_preference=None):
         """Mock analysis for demonstration (replace with real AI when configured)"""
@@ -157,6 +188,14 @@ class WatsonxAIHelper:
 # Initialize AI helper
 ai_helper = WatsonxAIHelper()
 
+# One repeat-failure monitor per server process, shared by every session so
+# failures recorded by different engineers and shifts correlate
+@st.cache_resource
+def get_failure_monitor():
+    return RepeatFailureMonitor(window_hours=72, threshold=2)
+
+failure_monitor = get_failure_monitor()
+
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -219,11 +258,57 @@ def load_csv(path):
         st.warning(f"Could not load {path}")
         return pd.DataFrame()
 
+REPORTS_DIR = "reports"
+REPORT_RETENTION_SECONDS = 24 * 3600
+
+def new_report_file(prefix, report_format):
+    """Open a uniquely named report file, pruning reports older than the retention period"""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    cutoff = time.time() - REPORT_RETENTION_SECONDS
+    for name in os.listdir(REPORTS_DIR):
+        path = os.path.join(REPORTS_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # Another session may have removed it already
+    suffix = ".txt" if report_format == "summary" else f".{report_format}"
+    return tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="", dir=REPORTS_DIR,
+        prefix=f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_", suffix=suffix, delete=False
+    )
+
+# The selected row's notes already go into the prompt's component section, so the
+# console asks a question about that row rather than repeating the notes
+CONSOLE_QUESTION = "Assess the root cause of this failure and recommend next steps."
+
+def prompt_caption(prompt):
+    if prompt is None:
+        return "Prompt: could not fit the token budget"
+    caption = f"Prompt: {prompt.total_tokens}/{prompt.budget} tokens ({prompt.prefix_tokens} shared prefix)"
+    if prompt.dropped:
+        caption += f" — trimmed to fit: {', '.join(prompt.dropped)}"
+    return caption
+
 # Load Data
 ref_df = load_csv("data/refcode_fru_map.csv")
 rules_df = load_csv("data/metis_model_rules.csv")
 cmd_df = load_csv("data/se_command_library.csv")
 
+# One response cache per server process, so every session benefits from its hits
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache(max_entries=256)
+
+# One prompt builder per version of the reference data, so its memoised prompt
+# prefixes survive reruns and are shared across sessions
+@st.cache_resource
+def get_prompt_builder(ref_df, rules_df, cmd_df):
+    return PromptBuilder(ref_df, rules_df, cmd_df)
+
+ai_helper.prompt_builder = get_prompt_builder(ref_df, rules_df, cmd_df)
+ai_helper.response_cache = get_response_cache()
+
 # Enhanced Header with gradient background
 st.markdown("""
 <div class="main-header">
@@ -268,6 +353,11 @@ with col4:
 st.markdown('<div class="diagnostic-panel">', unsafe_allow_html=True)
 st.subheader("🔍 Diagnostic Console")
 
+# Live repeat-failure alerts
+active_alerts = failure_monitor.active_alerts()
+for alert in active_alerts:
+    st.error(f"🚨 Repeat failure: {alert.scope.upper()} `{alert.key}` reached {alert.count} failures within {alert.window_hours}hr window")
+
 # Enhanced Search Bar
 st.markdown('<div class="search-container">', unsafe_allow_html=True)
 search_query = st.text_input("🔎 Search IBM Metis components (Titania, Hemlock, Pavo, zHyperLink, FRU numbers, etc.)", placeholder="Type to search refcodes, FRU numbers, drawer types, locations, or notes...")
@@ -365,6 +455,18 @@ if not ref_df.empty:
         st.markdown(f"**SE Command:** `{se_commands}`")
         st.markdown(f"**Notes:** _{notes}_")
         
+        # Repeat-failure tracking for this FRU / slot
+        fru_code = match_row['fru_code'] if 'fru_code' in match_row else fru_number
+        fru_failures = failure_monitor.failure_count("fru", fru_code)
+        slot_failures = failure_monitor.failure_count("slot", location)
+        st.markdown(f"**Failures in last {failure_monitor.window_hours}hr:** FRU {fru_failures} · Slot {slot_failures}")
+        if st.button("🚨 Record Failure Event"):
+            new_alerts = failure_monitor.record_failure(datetime.now(), refcode, fru_code, location)
+            for alert in new_alerts:
+                st.error(f"🚨 Repeat failure: {alert.scope.upper()} `{alert.key}` reached {alert.count} failures within {alert.window_hours}hr window")
+            if not new_alerts:
+                st.success("Failure event recorded.")
+        
         # AI-Powered Diagnostic Analysis
         st.markdown("---")
         st.markdown("### 🤖 **Granite AI Analysis**")
@@ -380,13 +482,15 @@ if not ref_df.empty:
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("#### Granite-3-2-8B Analysis:")
-            analysis_8b = ai_helper.generate_diagnostic_analysis(refcode, fru_name, notes, "granite-3-2-8b")
+            analysis_8b, prompt_8b = ai_helper.generate_analysis_with_prompt(refcode, fru_name, CONSOLE_QUESTION, "granite-3-2-8b", match_row)
             st.markdown(analysis_8b)
+            st.caption(prompt_caption(prompt_8b))
             
         with col2:
             st.markdown("#### Granite-13B-Chat Analysis:")
-            analysis_13b = ai_helper.generate_diagnostic_analysis(refcode, fru_name, notes, "granite-13b-chat")
+            analysis_13b, prompt_13b = ai_helper.generate_analysis_with_prompt(refcode, fru_name, CONSOLE_QUESTION, "granite-13b-chat", match_row)
             st.markdown(analysis_13b)
+            st.caption(prompt_caption(prompt_13b))
         
         # AI-suggested commands comparison
         with st.expander("🧠 AI-Suggested SE Commands Comparison"):
@@ -423,6 +527,17 @@ if not ref_df.empty:
             st.markdown(f"🔗 [View Full Refcode Details in IQYedit]({iqyedit_url})")
             st.info("IBM internal portal. Opens full engineering notes for this code.")
 
+    # Bulk report generation for the current search results
+    with st.expander("📄 Bulk Diagnostic Reports"):
+        report_format = st.selectbox("Report Format", FORMATS, key="fru_report_format")
+        if st.button("Generate Reports for Search Results") and len(filtered_df) > 0:
+            with new_report_file("diagnostic_summary", report_format) as report_handle:
+                write_reports(iter_records(filtered_df), report_handle, "fru", report_format)
+            report_path = report_handle.name
+            st.success(f"{len(filtered_df)} report(s) written to `{report_path}`")
+            with open(report_path, "rb") as report_file:
+                st.download_button("⬇️ Download Reports", report_file, file_name=os.path.basename(report_path))
+
 st.markdown('</div>', unsafe_allow_html=True)
 
 # AI Assistant Panel
@@ -471,9 +586,10 @@ user_question = st.text_area(
 if st.button("🧠 Ask Granite AI") and user_question:
     with st.spinner(f"Granite AI ({selected_model}) is analyzing your question..."):
         # Generate AI response using selected model
-        ai_response = ai_helper.generate_diagnostic_analysis("USER_QUERY", "General", user_question, selected_model)
+        ai_response, question_prompt = ai_helper.generate_analysis_with_prompt("USER_QUERY", "General", user_question, selected_model)
         st.markdown(f"### 🤖 **{selected_model.upper()} Response:**")
         st.markdown(ai_response)
+        st.caption(prompt_caption(question_prompt))
         
         # Model-specific command suggestions
         suggested_cmds = ai_helper.suggest_se_commands(user_question, selected_model)
@@ -608,6 +724,8 @@ if st.button("📋 Log Operation Step"):
         st.session_state.operation_log = []
     st.session_state.operation_log.append(log_entry)
     st.success("Operation logged successfully!")
+    for alert in failure_monitor.record_operation(datetime.now(), op_code, status):
+        st.error(f"🚨 Repeat failure: operation `{alert.key}` failed {alert.count}x within {alert.window_hours}hr window")
 
 # Display operation log
 if "operation_log" in st.session_state and st.session_state.operation_log:
@@ -615,6 +733,18 @@ if "operation_log" in st.session_state and st.session_state.operation_log:
     for entry in st.session_state.operation_log[-5:]:  # Show last 5 entries
         st.text(entry)
 
+    # Shift handover report from the full operation log
+    col1, col2 = st.columns(2)
+    with col1:
+        log_report_format = st.selectbox("Shift Report Format", FORMATS, key="log_report_format")
+    with col2:
+        if st.button("📄 Generate Shift Report"):
+            with new_report_file("shift_report", log_report_format) as report_handle:
+                write_reports(st.session_state.operation_log, report_handle, "operation", log_report_format, title="Shift Operation Log")
+            report_path = report_handle.name
+            with open(report_path, "rb") as report_file:
+                st.download_button("⬇️ Download Shift Report", report_file, file_name=os.path.basename(report_path))
+
 st.markdown('</div>', unsafe_allow_html=True)
 
 # watsonx.ai Configuration Panel
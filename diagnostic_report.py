@@ -0,0 +1,264 @@
+import argparse
+import csv
+import html
+import io
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from string import Template
+
+import pandas as pd
+
+FRU_FIELDS = ["refcode", "fru_code", "fru_name", "drawer", "location", "recovered", "se_commands", "notes"]
+OPERATION_FIELDS = ["timestamp", "op_code", "operation", "status", "notes"]
+FORMATS = ["summary", "csv", "html"]
+
+# Templates are compiled once at import time and reused for every row
+SUMMARY_TEMPLATES = {
+    "fru": Template(
+        "[Diagnostic Summary]\n"
+        "FRU: $fru_name $fru_code (refcode $refcode) — $notes_sentence\n"
+        "$drawer, Slot $location — $recovery_text.\n"
+        "Recommend: $recommendation.\n"
+    ),
+    "operation": Template(
+        "[Diagnostic Summary]\n"
+        "Operation: $operation — $status at $timestamp.\n"
+        "Notes: $notes_sentence\n"
+        "Recommend: $recommendation.\n"
+    ),
+    "unparseable": Template(
+        "[Diagnostic Summary]\n"
+        "UNPARSEABLE LOG ENTRY: $notes\n"
+        "Recommend: $recommendation.\n"
+    ),
+}
+
+HTML_ROW_TEMPLATES = {
+    kind: Template("<tr>" + "".join(f"<td>${field}</td>" for field in fields) + "</tr>\n")
+    for kind, fields in (("fru", FRU_FIELDS), ("operation", OPERATION_FIELDS))
+}
+
+HTML_HEADER = Template(
+    "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>$title</title></head>\n"
+    "<body><h1>$title</h1>\n<table border=\"1\" cellspacing=\"0\" cellpadding=\"4\">\n"
+    "<tr>$header_cells</tr>\n"
+)
+HTML_FOOTER = "</table>\n</body></html>\n"
+
+# Matches entries written by the Diagnostic Step Recorder in app.py; notes come from
+# a text area and may span several lines, or be only whitespace
+LOG_ENTRY_PATTERN = re.compile(
+    r"^\[(?P<timestamp>[^\]\n]+)\] (?P<op_code>\S+) - (?P<operation>[^\n]*?) \| Status: (?P<status>[^|\n]+?)"
+    r"(?: \| Notes:(?: (?P<notes>.*))?)?$",
+    re.DOTALL
+)
+LOG_ENTRY_START = re.compile(r"^\[[^\]]+\] \S+ - ")
+
+
+def _text(value, default="N/A"):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return default
+    text = str(value).strip()
+    return text or default
+
+
+def _sentence(text):
+    return text if text.endswith((".", "!", "?")) else text + "."
+
+
+def fru_context(row):
+    """Template fields for a `refcode_fru_map.csv` row."""
+    context = {field: _text(row.get(field)) for field in FRU_FIELDS}
+    if context["fru_code"] == "N/A" and row.get("fru_number") is not None:
+        context["fru_code"] = _text(row.get("fru_number"))
+    context["notes_sentence"] = _sentence(context["notes"])
+    if context["recovered"] == "Yes":
+        context["recovery_text"] = "recovered"
+        context["recommendation"] = "Monitor for repeat failure within 72hr window"
+    else:
+        context["recovery_text"] = "not recovered"
+        context["recommendation"] = f"Run `{context['se_commands']}` and escalate for FRU replacement"
+    return context
+
+
+def operation_context(entry):
+    """Template fields for an operation log entry (a dict or a raw log line)."""
+    if isinstance(entry, str):
+        parsed = parse_log_entry(entry)
+        if parsed is None:
+            # Never guess at an entry we can't read; flag it for a human instead
+            context = {field: "" for field in OPERATION_FIELDS}
+            context.update(
+                status="UNPARSEABLE",
+                notes=entry.strip(),
+                notes_sentence=entry.strip(),
+                recommendation="Review this log entry manually",
+                summary_template="unparseable",
+            )
+            return context
+        entry = parsed
+    context = {field: _text(entry.get(field), default="") for field in OPERATION_FIELDS}
+    context["notes_sentence"] = _sentence(context["notes"]) if context["notes"] else "None recorded."
+    if context["status"] == "Failed":
+        context["recommendation"] = "Rerun operation and monitor for repeat failure within 72hr window"
+    elif context["status"] in ("Not Started", "In Progress"):
+        context["recommendation"] = "Hand over to next shift to complete"
+    else:
+        context["recommendation"] = "No action required"
+    return context
+
+
+CONTEXT_BUILDERS = {"fru": fru_context, "operation": operation_context}
+FIELDS = {"fru": FRU_FIELDS, "operation": OPERATION_FIELDS}
+
+
+def parse_log_entry(line):
+    match = LOG_ENTRY_PATTERN.match(line.strip())
+    return match.groupdict() if match else None
+
+
+def iter_log_entries(lines):
+    """Group raw log lines into entries, joining multi-line notes onto their entry."""
+    entry = None
+    for line in lines:
+        line = line.rstrip("\n")
+        if LOG_ENTRY_START.match(line) or entry is None:
+            if entry is not None:
+                yield entry
+            entry = line
+        else:
+            entry += "\n" + line
+    if entry is not None:
+        yield entry
+
+
+def _render_csv_row(kind, context):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow([context[field] for field in FIELDS[kind]])
+    return buffer.getvalue()
+
+
+def _render_batch(kind, fmt, records):
+    """Render a batch of records to one string; runs in worker processes."""
+    build = CONTEXT_BUILDERS[kind]
+    parts = []
+    for record in records:
+        context = build(record)
+        if fmt == "summary":
+            template = SUMMARY_TEMPLATES[context.get("summary_template", kind)]
+            parts.append(template.substitute(context) + "\n")
+        elif fmt == "csv":
+            parts.append(_render_csv_row(kind, context))
+        else:
+            escaped = {key: html.escape(value) for key, value in context.items()}
+            parts.append(HTML_ROW_TEMPLATES[kind].substitute(escaped))
+    return "".join(parts)
+
+
+def _batched(records, batch_size):
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_records(source):
+    """Yield row dicts from a DataFrame, an iterable of DataFrame chunks, or dicts."""
+    if isinstance(source, pd.DataFrame):
+        source = [source]
+    for item in source:
+        if isinstance(item, pd.DataFrame):
+            columns = list(item.columns)
+            for values in item.itertuples(index=False, name=None):
+                yield dict(zip(columns, values))
+        else:
+            yield item
+
+
+def render_reports(records, kind="fru", fmt="summary", workers=1, batch_size=500):
+    """Yield rendered report text batch by batch, in input order.
+
+    With `workers` > 1 batches are rendered in a process pool; only a bounded number
+    of batches are in flight so memory stays flat regardless of input size.
+    """
+    batches = _batched(records, batch_size)
+    if workers <= 1:
+        for batch in batches:
+            yield _render_batch(kind, fmt, batch)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(_render_batch, kind, fmt, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_reports(records, output, kind="fru", fmt="summary", workers=1, batch_size=500, title="Diagnostic Summary"):
+    """Stream rendered reports to `output` (a path or text file object)."""
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "w", encoding="utf-8", newline="") as handle:
+            write_reports(records, handle, kind, fmt, workers, batch_size, title)
+            return
+
+    if fmt == "csv":
+        output.write(",".join(FIELDS[kind]) + "\n")
+    elif fmt == "html":
+        header_cells = "".join(f"<th>{field}</th>" for field in FIELDS[kind])
+        output.write(HTML_HEADER.substitute(title=html.escape(title), header_cells=header_cells))
+
+    for chunk in render_reports(records, kind, fmt, workers, batch_size):
+        output.write(chunk)
+    if fmt == "html":
+        output.write(HTML_FOOTER)
+
+
+def filter_rows(df, query=None, recovered=None):
+    """Case-insensitive substring search across all columns, as in the Diagnostic Console."""
+    if query:
+        term = query.lower().strip()
+        mask = df.astype(str).apply(lambda col: col.str.lower().str.contains(term, regex=False, na=False)).any(axis=1)
+        df = df[mask]
+    if recovered:
+        df = df[df["recovered"] == recovered]
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate bulk diagnostic summary reports.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--input", default="data/refcode_fru_map.csv", help="refcode/FRU CSV to report on")
+    source.add_argument("--oplog", help="operation log file of step recorder entries")
+    parser.add_argument("--output", required=True, help="destination file")
+    parser.add_argument("--format", choices=FORMATS, default="summary")
+    parser.add_argument("--query", help="only rows containing this text")
+    parser.add_argument("--recovered", choices=["Yes", "No"], help="only rows with this recovery status")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    if args.oplog:
+        kind = "operation"
+        with open(args.oplog, encoding="utf-8") as handle:
+            records = iter_log_entries(handle)
+            write_reports(records, args.output, kind, args.format, args.workers, args.batch_size, "Shift Operation Log")
+    else:
+        kind = "fru"
+        chunks = (filter_rows(chunk, args.query, args.recovered)
+                  for chunk in pd.read_csv(args.input, chunksize=args.batch_size * 10))
+        write_reports(iter_records(chunks), args.output, kind, args.format, args.workers, args.batch_size)
+
+    print(f"Reports written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+
+import pandas as pd
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FRU_TYPES = [
+    ("RoCE Adapter", "LG", "lsdev -C|grep RoCE", "Intermittent link stability"),
+    ("Power Supply", "HP", "pwrcheck -v", "Fluctuation detected prior to swap"),
+    ("Network Controller", "NET", "diag_net -v", "NETUCODE trigger: firmware stall detected"),
+    ("Processor Card", "PC", "memcheck -d", "Intermittent DIMM ECC errors"),
+    ("DCM Module", "DC", "zm_dcm_data.py", "Thermal errors under load"),
+    ("VPD Card", "VP", "vpd_restore.sh", "VPD checksum mismatch"),
+]
+
+QUESTIONS = [
+    "DCM showing thermal errors in drawer 3, what should I check?",
+    "RoCE adapter link flapping after firmware update",
+    "Power supply fluctuation in drawer 1",
+    "Memory ECC errors on processor card",
+]
+
+SEARCH_LABEL = "🔎 Search IBM Metis components (Titania, Hemlock, Pavo, zHyperLink, FRU numbers, etc.)"
+
+
+def build_synthetic_workspace(rows, seed=0):
+    """Create a temp directory laid out like the repo, with a synthetic refcode map."""
+    rng = random.Random(seed)
+    workspace = tempfile.mkdtemp(prefix="testlab_load_")
+    os.makedirs(os.path.join(workspace, "data"))
+    shutil.copytree(os.path.join(APP_DIR, "static"), os.path.join(workspace, "static"))
+    for name in ("metis_model_rules.csv", "se_command_library.csv"):
+        shutil.copy(os.path.join(APP_DIR, "data", name), os.path.join(workspace, "data", name))
+
+    records = []
+    for i in range(rows):
+        fru_name, prefix, command, note = rng.choice(FRU_TYPES)
+        fru_code = f"{prefix}{i:05d}"
+        records.append({
+            "refcode": f"{rng.randrange(16**6):06X}",
+            "fru_code": fru_code,
+            "fru_name": fru_name,
+            "drawer": f"Drawer {rng.randrange(5)}",
+            "location": f"P1-{rng.choice('ABCDEF')}{rng.randrange(1, 10)}",
+            "recovered": rng.choice(["Yes", "No"]),
+            "se_commands": command,
+            "notes": note,
+        })
+    pd.DataFrame(records).to_csv(os.path.join(workspace, "data", "refcode_fru_map.csv"), index=False)
+    return workspace, records
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workspace, timeout):
+    """Start one `streamlit run app.py` server serving the workspace; returns (process, port, log path)."""
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [APP_DIR, os.environ.get("PYTHONPATH")])))
+    # Keep the mocked Granite backend in play regardless of the caller's environment
+    for var in ("WATSONX_API_KEY", "WATSONX_PROJECT_ID"):
+        env.pop(var, None)
+    log_path = os.path.join(workspace, "server.log")
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", os.path.join(APP_DIR, "app.py"),
+             "--server.headless", "true", "--server.port", str(port), "--server.address", "127.0.0.1",
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            cwd=workspace, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return process, port, log_path
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    with open(log_path) as log:
+        raise RuntimeError(f"Streamlit server did not become healthy within {timeout}s:\n{log.read()[-2000:]}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def server_memory_mb(pid):
+    """Resident and peak resident memory of the server process, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if ":" in line)
+    except OSError:
+        return None, None
+    return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+
+
+class SessionClient:
+    """One simulated engineer: a browser-protocol websocket session on the shared server.
+
+    Like the frontend it keeps the state of every widget on screen and sends it with
+    each rerun request; a rerun's latency runs from sending the request to the
+    server's script_finished message.
+    """
+
+    def __init__(self, port, records, timeout, seed):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.records = records
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.websocket = None
+        self.widgets = {}  # label -> element proto from the latest run
+        self.states = {}  # widget id -> WidgetState sent with the next rerun
+        self.latencies = []
+        self.errors = Counter()
+
+    async def connect(self):
+        self.websocket = await asyncio.wait_for(
+            websockets.connect(self.url, subprotocols=["streamlit"], max_size=None), self.timeout
+        )
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    def _set(self, label, **value):
+        element = self.widgets.get(label)
+        if element is None:
+            raise LookupError(f"Widget not found: {label}")
+        state = WidgetState(id=element.id, **value)
+        self.states[element.id] = state
+
+    async def _receive_run(self):
+        """Read messages until the script run finishes; returns the number of app exceptions."""
+        exceptions = 0
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(await self.websocket.recv())
+            kind = message.WhichOneof("type")
+            if kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+                element_type = message.delta.new_element.WhichOneof("type")
+                element = getattr(message.delta.new_element, element_type)
+                if element_type == "exception":
+                    exceptions += 1
+                elif getattr(element, "id", "") and getattr(element, "label", ""):
+                    self.widgets[element.label] = element
+            elif kind == "script_finished" and message.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return exceptions
+
+    async def rerun(self, step):
+        """Send the current widget states, wait for the run to finish; False if the app raised."""
+        request = BackMsg()
+        request.rerun_script.query_string = ""
+        request.rerun_script.widget_states.widgets.extend(self.states.values())
+        # Button clicks only last for the run they trigger
+        self.states = {key: state for key, state in self.states.items() if not state.trigger_value}
+        self.widgets = {}
+        start = time.perf_counter()
+        await self.websocket.send(request.SerializeToString())
+        try:
+            exceptions = await asyncio.wait_for(self._receive_run(), self.timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"'{step}' rerun did not finish within {self.timeout}s") from None
+        self.latencies.append(time.perf_counter() - start)
+        # Widgets that are no longer on screen drop out of the state, as in the browser
+        live = {element.id for element in self.widgets.values()}
+        self.states = {key: state for key, state in self.states.items() if key in live}
+        if exceptions:
+            self.errors[step] += 1
+            return False
+        return True
+
+    async def run_flow(self):
+        record = self.rng.choice(self.records)
+        await self.rerun("load")
+        # Search for a FRU; if the search errors, clear it so the rest of the flow still runs
+        self._set(SEARCH_LABEL, string_value=record["fru_name"].split()[0])
+        if not await self.rerun("search"):
+            self._set(SEARCH_LABEL, string_value="")
+            await self.rerun("clear_search")
+        refcodes = self.widgets.get("Select a Refcode")
+        if refcodes is not None and not refcodes.disabled and refcodes.options:
+            choice = record["refcode"] if record["refcode"] in refcodes.options else self.rng.choice(refcodes.options)
+            self._set("Select a Refcode", string_value=choice)
+            await self.rerun("select_refcode")
+            # Failure events feed the repeat-failure monitor shared by every session
+            if "🚨 Record Failure Event" in self.widgets:
+                self._set("🚨 Record Failure Event", trigger_value=True)
+                await self.rerun("record_failure")
+        # Ask Granite (demo-mode mock backend)
+        self._set("Describe your hardware issue or ask a diagnostic question:", string_value=self.rng.choice(QUESTIONS))
+        self._set("🧠 Ask Granite AI", trigger_value=True)
+        await self.rerun("ask_granite")
+        # Log an operation step
+        self._set("Operation Status", string_value=self.rng.choice(["Completed", "Failed", "In Progress"]))
+        self._set("📋 Log Operation Step", trigger_value=True)
+        await self.rerun("log_step")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def _drive_sessions(port, pid, records, sessions, iterations, timeout, seed):
+    # Warm-up session so module imports and the CSV/resource caches don't skew the measurements
+    warmup = SessionClient(port, records, timeout, seed - 1)
+    await warmup.connect()
+    await warmup.rerun("warmup")
+    await warmup.close()
+    baseline_rss, _ = server_memory_mb(pid)
+
+    clients = [SessionClient(port, records, timeout, seed + i) for i in range(sessions)]
+    try:
+        await asyncio.gather(*(client.connect() for client in clients))
+        started = time.perf_counter()
+        await asyncio.gather(*(_drive(client, iterations) for client in clients))
+        wall_time = time.perf_counter() - started
+        # Sample while every session is still connected and holding its state
+        rss, peak_rss = server_memory_mb(pid)
+    finally:
+        await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+    return clients, wall_time, baseline_rss, rss, peak_rss
+
+
+async def _drive(client, iterations):
+    for _ in range(iterations):
+        await client.run_flow()
+
+
+def run_load_test(sessions, iterations, rows, timeout=60, seed=0):
+    """Drive `sessions` concurrent sessions against one app server and return a metrics dict.
+
+    All sessions share a single `streamlit run` server, so `st.cache_resource` objects
+    such as the repeat-failure monitor and the response cache are shared as in
+    production. Memory is the server's resident set, sampled from /proc.
+    """
+    workspace, records = build_synthetic_workspace(rows, seed)
+    try:
+        process, port, _ = start_server(workspace, timeout)
+        try:
+            clients, wall_time, baseline_rss, rss, peak_rss = asyncio.run(
+                _drive_sessions(port, process.pid, records, sessions, iterations, timeout, seed)
+            )
+        finally:
+            stop_server(process)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "rows": rows,
+        "reruns": len(latencies),
+        "errors": sum((client.errors for client in clients), Counter()),
+        "wall_time_s": wall_time,
+        "throughput_reruns_per_s": len(latencies) / wall_time if wall_time else 0.0,
+        "latency_mean_ms": statistics.mean(latencies) * 1000,
+        "latency_p50_ms": _percentile(latencies, 50) * 1000,
+        "latency_p90_ms": _percentile(latencies, 90) * 1000,
+        "latency_p99_ms": _percentile(latencies, 99) * 1000,
+        "latency_max_ms": max(latencies) * 1000,
+        "server_rss_mb": rss,
+        "server_peak_rss_mb": peak_rss,
+        "memory_per_session_mb": (rss - baseline_rss) / sessions if rss is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py on one Streamlit server.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8], help="concurrent session counts to test")
+    parser.add_argument("--iterations", type=int, default=3, help="flows per session")
+    parser.add_argument("--rows", type=int, default=1000, help="rows in the synthetic refcode map")
+    parser.add_argument("--timeout", type=float, default=60, help="timeout in seconds for server start and each rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    errors = Counter()
+    print(f"{'sessions':>8} {'reruns':>7} {'errors':>6} {'rerun/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'RSS MB':>8} {'MB/sess':>8}")
+    for sessions in args.sessions:
+        result = run_load_test(sessions, args.iterations, args.rows, args.timeout, args.seed)
+        rss = "n/a" if result["server_rss_mb"] is None else f"{result['server_rss_mb']:.1f}"
+        per_session = "n/a" if result["memory_per_session_mb"] is None else f"{result['memory_per_session_mb']:.2f}"
+        print(f"{result['sessions']:>8} {result['reruns']:>7} {sum(result['errors'].values()):>6} "
+              f"{result['throughput_reruns_per_s']:>8.1f} {result['latency_p50_ms']:>8.1f} "
+              f"{result['latency_p90_ms']:>8.1f} {result['latency_p99_ms']:>8.1f} "
+              f"{result['latency_max_ms']:>8.1f} {rss:>8} {per_session:>8}")
+        errors.update(result["errors"])
+    # App exceptions are reported per step rather than hidden by adapting the dataset
+    for step, count in sorted(errors.items()):
+        print(f"app raised an exception on {count} '{step}' rerun(s)")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
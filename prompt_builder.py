@@ -0,0 +1,279 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict, namedtuple
+
+import pandas as pd
+
+# Prompt limits per Granite model: the model's context window, the tokens reserved
+# for generation (matches WatsonxClient.ask) and the largest prompt we are willing
+# to send even when the window allows more
+MODEL_BUDGETS = {
+    "granite-3-2-8b": {"context_window": 131072, "max_new_tokens": 200, "max_prompt_tokens": 4096},
+    "granite-13b-chat": {"context_window": 8192, "max_new_tokens": 200, "max_prompt_tokens": 2048},
+}
+
+SYSTEM_PROMPT = (
+    "You are the IBM Metis TestLab Advisor, a hardware diagnostic assistant for IBM Z "
+    "manufacturing test engineers. Use only the component data, SE command guidance and "
+    "model constraints provided. Give a root cause assessment, numbered actions with SE "
+    "commands, and a recovery outlook. Be concise."
+)
+
+ANSWER_CUE = "Answer:\n"
+
+# Per-field character caps for row values, so one huge notes cell can't crowd out the rest
+FIELD_CHAR_LIMITS = {"notes": 600, "se_commands": 200}
+DEFAULT_FIELD_CHAR_LIMIT = 80
+# Tokens always kept free for the question when the component section is squeezed
+MIN_QUESTION_TOKENS = 32
+
+BuiltPrompt = namedtuple(
+    "BuiltPrompt",
+    ["text", "prefix", "model", "section_tokens", "prefix_tokens", "total_tokens", "budget", "dropped", "cache_key"]
+)
+
+
+def estimate_tokens(text):
+    """Deterministic token estimate (~4 characters per token for English/code text)."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _value(row, field, default="N/A"):
+    value = row.get(field, default) if hasattr(row, "get") else default
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return default
+    return str(value)
+
+
+class ResponseCache:
+    """Thread-safe LRU of model responses keyed by `BuiltPrompt.cache_key`."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        with self.lock:
+            self.entries[key] = response
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class PromptBuilder:
+    """Builds Granite prompts from the selected row and the reference CSVs.
+
+    Every prompt starts with the same prefix (system instructions plus the model rules
+    table) so upstream prefix caching can reuse it. The per-request context follows in
+    a fixed section order; when the budget is tight, whole items are dropped from the
+    lowest-priority sections first, so the same inputs always give the same prompt.
+    """
+
+    # Optional sections, most important first; similar notes are given up first
+    SECTION_PRIORITY = ["command_guidance", "model_constraints", "similar_notes"]
+    SECTION_TITLES = {
+        "component": "Selected component",
+        "command_guidance": "SE command guidance",
+        "model_constraints": "Applicable model constraints",
+        "similar_notes": "Similar failure notes",
+        "question": "Question",
+    }
+    SECTION_ORDER = ["component", "command_guidance", "model_constraints", "similar_notes", "question"]
+
+    def __init__(self, ref_df, rules_df, cmd_df, token_counter=estimate_tokens, max_similar_notes=5):
+        self.ref_df = ref_df
+        self.rules_df = rules_df
+        self.cmd_df = cmd_df
+        self.count_tokens = token_counter
+        self.max_similar_notes = max_similar_notes
+        self._prefixes = {}
+
+    def budget(self, model_key):
+        limits = MODEL_BUDGETS[model_key]
+        return min(limits["context_window"] - limits["max_new_tokens"], limits["max_prompt_tokens"])
+
+    def prefix(self, model_key):
+        """Shared system/context prefix, built once per model and byte-identical afterwards."""
+        if model_key not in self._prefixes:
+            lines = [SYSTEM_PROMPT, "", "Metis model rules:"]
+            # Prefix may use at most half the budget; rules beyond that are left out
+            limit = self.budget(model_key) // 2 - self.count_tokens("\n".join(lines))
+            if not self.rules_df.empty:
+                for _, rule in self.rules_df.sort_values("model").iterrows():
+                    line = (f"- {_value(rule, 'model')}: {_value(rule, 'drawer_type')} drawer, "
+                            f"max {_value(rule, 'max_cards')} cards, domains {_value(rule, 'domains')}, "
+                            f"{_value(rule, 'fanout_type')} fanout, deprecated cards {_value(rule, 'deprecated_cards')}; "
+                            f"{_value(rule, 'notes')}")
+                    cost = self.count_tokens(line + "\n")
+                    if cost > limit:
+                        break
+                    lines.append(line)
+                    limit -= cost
+            self._prefixes[model_key] = "\n".join(lines) + "\n\n"
+        return self._prefixes[model_key]
+
+    def _component_items(self, row):
+        fields = ["refcode", "fru_code", "fru_name", "drawer", "location", "recovered", "se_commands", "notes"]
+        return [
+            f"{field}: {_clip(_value(row, field), FIELD_CHAR_LIMITS.get(field, DEFAULT_FIELD_CHAR_LIMIT))}"
+            for field in fields if field in row
+        ]
+
+    def _command_items(self, row):
+        if self.cmd_df.empty or not len(row):
+            return []
+        refcode = _value(row, "refcode", "")
+        fru_code = _value(row, "fru_code", "")
+        items = []
+        for _, cmd in self.cmd_df.iterrows():
+            pattern = _value(cmd, "pattern", "")
+            if pattern and (refcode.startswith(pattern) or fru_code.startswith(pattern)):
+                items.append(f"{_value(cmd, 'command_set')} — {_value(cmd, 'reason')}")
+        return items
+
+    def _constraint_items(self, row):
+        if self.rules_df.empty or not len(row):
+            return []
+        fru_code = _value(row, "fru_code", "")
+        fru_words = _value(row, "fru_name", "").lower().split()
+        items = []
+        for _, rule in self.rules_df.sort_values("model").iterrows():
+            deprecated = _value(rule, "deprecated_cards", "")
+            notes = _value(rule, "notes", "").lower()
+            if fru_code and fru_code in deprecated:
+                items.append(f"{_value(rule, 'model')}: {fru_code} is a deprecated card")
+            elif any(word in notes for word in fru_words if len(word) > 2):
+                items.append(f"{_value(rule, 'model')}: {_value(rule, 'notes')}")
+        return items
+
+    def _similar_note_items(self, row):
+        if self.ref_df.empty or not len(row):
+            return []
+        same_fru = self.ref_df["fru_name"] == _value(row, "fru_name")
+        same_refcode = self.ref_df["refcode"].astype(str) == _value(row, "refcode")
+        not_self = self.ref_df["fru_code"].astype(str) != _value(row, "fru_code")
+        similar = self.ref_df[(same_fru | same_refcode) & not_self]
+        # Exact refcode matches rank above FRU-name matches
+        similar = similar.assign(_rank=~same_refcode[similar.index]).sort_values(["_rank", "refcode", "fru_code"])
+        return [
+            f"{_value(note, 'refcode')} {_value(note, 'fru_code')} ({_value(note, 'location')}, "
+            f"recovered {_value(note, 'recovered')}): {_clip(_value(note, 'notes'), FIELD_CHAR_LIMITS['notes'])}"
+            for _, note in similar.head(self.max_similar_notes).iterrows()
+        ]
+
+    def _render_section(self, name, items):
+        if not items:
+            return ""
+        return f"{self.SECTION_TITLES[name]}:\n" + "\n".join(f"- {item}" for item in items) + "\n\n"
+
+    def _truncate(self, text, fits):
+        """Longest prefix of `text` (marked with an ellipsis) accepted by `fits`, or None."""
+        if not fits("…"):
+            return None
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if fits(text[:mid] + "…"):
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low].rstrip() + "…"
+
+    def _section_cost(self, name, items):
+        return self.count_tokens(self._render_section(name, items))
+
+    def build(self, model_key, row, question):
+        """Build the prompt for `row` (a ref_df row, or None) and `question` within the model's budget.
+
+        Raises ValueError if even the prefix and the most truncated required sections
+        cannot fit, so an over-budget prompt is never returned.
+        """
+        row = {} if row is None else row
+        budget = self.budget(model_key)
+        prefix = self.prefix(model_key)
+        sections = {
+            "component": self._component_items(row),
+            "command_guidance": self._command_items(row),
+            "model_constraints": self._constraint_items(row),
+            "similar_notes": self._similar_note_items(row),
+        }
+        dropped = []
+        remaining = budget - self.count_tokens(prefix) - self.count_tokens(ANSWER_CUE)
+
+        # Squeeze the component section, longest field first, until the question has room.
+        # A field that can't be made to fit is cut to a bare ellipsis and the next one is
+        # tried; once nothing gets shorter the final budget check decides.
+        component = sections["component"]
+        allowance = remaining - MIN_QUESTION_TOKENS
+        while component and self._section_cost("component", component) > allowance:
+            longest = max(range(len(component)), key=lambda i: len(component[i]))
+            shortened = self._truncate(
+                component[longest][:-1],
+                lambda candidate: self._section_cost(
+                    "component", component[:longest] + [candidate] + component[longest + 1:]
+                ) <= allowance,
+            ) or "…"
+            if len(shortened) >= len(component[longest]):
+                break
+            component[longest] = shortened
+            if "component" not in dropped:
+                dropped.append("component")
+        remaining -= self._section_cost("component", component)
+
+        question_text = " ".join(str(question).split())
+        if self._section_cost("question", [question_text]) > remaining:
+            # Hard-truncate the question (longest prefix that fits) so required sections always fit
+            question_text = self._truncate(
+                question_text, lambda candidate: self._section_cost("question", [candidate]) <= remaining
+            ) or "…"
+            dropped.append("question")
+        sections["question"] = [question_text]
+        remaining -= self._section_cost("question", [question_text])
+
+        for name in self.SECTION_PRIORITY:
+            items = sections[name]
+            kept = []
+            for item in items:
+                cost = self._section_cost(name, kept + [item]) - self._section_cost(name, kept)
+                if cost > remaining:
+                    break
+                kept.append(item)
+                remaining -= cost
+            if len(kept) < len(items):
+                dropped.append(name)
+            sections[name] = kept
+
+        rendered = {name: self._render_section(name, sections[name]) for name in self.SECTION_ORDER}
+        text = prefix + "".join(rendered[name] for name in self.SECTION_ORDER) + ANSWER_CUE
+        total_tokens = self.count_tokens(text)
+        if total_tokens > budget:
+            raise ValueError(f"Prompt needs {total_tokens} tokens but {model_key} allows {budget}")
+        section_tokens = {name: self.count_tokens(body) for name, body in rendered.items()}
+        return BuiltPrompt(
+            text=text,
+            prefix=prefix,
+            model=model_key,
+            section_tokens=section_tokens,
+            prefix_tokens=self.count_tokens(prefix),
+            total_tokens=total_tokens,
+            budget=budget,
+            dropped=dropped,
+            cache_key=hashlib.sha256(f"{model_key}\n{text}".encode("utf-8")).hexdigest(),
+        )
@@ -0,0 +1,213 @@
+import math
+import threading
+from array import array
+from collections import deque, namedtuple
+from datetime import datetime
+
+# Alert raised when a FRU or slot crosses the repeat-failure threshold
+RepeatFailureAlert = namedtuple(
+    "RepeatFailureAlert",
+    ["scope", "key", "count", "window_hours", "refcode", "fru_code", "location", "timestamp"]
+)
+
+
+def _to_epoch(timestamp):
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class SlidingWindowCounter:
+    """Event count over a sliding time window, kept in a fixed ring of time buckets.
+
+    Each bucket covers `bucket_seconds` and is only expired once its end is older than
+    the window, so the count never misses an event inside the window (it may include
+    up to one bucket of slightly older events). The ring holds one bucket more than
+    the window spans, so memory per key is constant and every update touches at most
+    the buckets that expired since the previous one.
+    """
+
+    def __init__(self, window_seconds, bucket_seconds):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = math.ceil(window_seconds / bucket_seconds) + 1
+        self.counts = array("I", [0]) * self.num_buckets
+        self.stamps = array("q", [-1]) * self.num_buckets  # absolute bucket index held by each slot
+        self.total = 0
+        self.tail = None  # oldest bucket index still inside the window
+        self.latest = None  # newest time seen, drives expiry
+
+    def _expire(self, epoch_seconds):
+        if self.latest is not None and epoch_seconds <= self.latest:
+            return
+        self.latest = epoch_seconds
+        # Bucket k ends at (k + 1) * bucket_seconds; drop it once that is <= now - window
+        new_tail = math.floor((epoch_seconds - self.window_seconds) / self.bucket_seconds)
+        if self.tail is None or self.total == 0:
+            pass
+        elif new_tail - self.tail >= self.num_buckets:
+            # Every live bucket lies before the new tail
+            self.counts = array("I", [0]) * self.num_buckets
+            self.total = 0
+        else:
+            for index in range(self.tail, new_tail):
+                slot = index % self.num_buckets
+                if self.stamps[slot] == index:
+                    self.total -= self.counts[slot]
+                    self.counts[slot] = 0
+        if self.tail is None or new_tail > self.tail:
+            self.tail = new_tail
+
+    def add(self, epoch_seconds, amount=1):
+        """Record an event and return the window count, or None if it arrived too late."""
+        self._expire(epoch_seconds)
+        bucket_index = math.floor(epoch_seconds / self.bucket_seconds)
+        if bucket_index < self.tail:
+            # Late event that already fell out of the window
+            return None
+        slot = bucket_index % self.num_buckets
+        if self.stamps[slot] != bucket_index:
+            # Whatever the slot held before has already expired
+            self.stamps[slot] = bucket_index
+            self.counts[slot] = 0
+        self.counts[slot] += amount
+        self.total += amount
+        return self.total
+
+    def count(self, epoch_seconds=None):
+        """Current count, optionally expiring buckets up to `epoch_seconds` first."""
+        if epoch_seconds is not None and self.tail is not None:
+            self._expire(epoch_seconds)
+        return self.total
+
+
+class RepeatFailureMonitor:
+    """Streaming repeat-failure detector for FRUs, slots and operation steps.
+
+    Failure events and logged operation steps are consumed one at a time; per-FRU,
+    per-slot and per-operation counters are updated incrementally so history is
+    never rescanned. One monitor is shared by every app session, so all methods are
+    thread-safe, and keys whose counters have drained are evicted periodically.
+
+    The bucketed counters feed the displayed counts. Alerts are decided exactly from
+    each key's last `threshold` failure timestamps, so they only fire when those
+    failures really fall within `window_hours` of each other.
+    """
+
+    def __init__(self, window_hours=72, threshold=2, bucket_minutes=60, max_alerts=200):
+        self.window_hours = window_hours
+        self.threshold = threshold
+        self.window_seconds = window_hours * 3600
+        self.bucket_seconds = bucket_minutes * 60
+        self.counters = {}
+        self.recent = {}  # key -> last `threshold` failure times, ascending
+        self.alerts = deque(maxlen=max_alerts)
+        self.events_seen = 0
+        self.events_since_sweep = 0
+        self.sweep_after = 1024
+        self.latest = None
+        self.lock = threading.Lock()
+
+    def _counter(self, scope, key):
+        counter = self.counters.get((scope, key))
+        if counter is None:
+            counter = SlidingWindowCounter(self.window_seconds, self.bucket_seconds)
+            self.counters[(scope, key)] = counter
+        return counter
+
+    def _observe(self, epoch):
+        """Track stream time and evict drained keys, amortised O(1) per event."""
+        self.events_seen += 1
+        self.events_since_sweep += 1
+        if self.latest is None or epoch > self.latest:
+            self.latest = epoch
+        # Sweeping only after as many events as there were live keys keeps the cost amortised
+        if self.events_since_sweep >= self.sweep_after:
+            self.events_since_sweep = 0
+            for key in [key for key, counter in self.counters.items() if counter.count(self.latest) == 0]:
+                del self.counters[key]
+                self.recent.pop(key, None)
+            self.sweep_after = max(len(self.counters), 1024)
+
+    def _repeating(self, times, now=None):
+        """True if the last `threshold` failures lie within one window (ending at `now` if given)."""
+        if len(times) < self.threshold:
+            return False
+        if now is not None and times[0] < now - self.window_seconds:
+            return False
+        return times[-1] - times[0] <= self.window_seconds
+
+    def _crossed(self, key, epoch):
+        """Remember a failure time; True if it just turned the key into a repeat failure."""
+        times = self.recent.get(key)
+        if times is None:
+            times = self.recent[key] = deque(maxlen=self.threshold)
+        was_repeating = self._repeating(times)
+        if len(times) == self.threshold and epoch <= times[0]:
+            # Older than every remembered failure; it can't change the newest set
+            return False
+        # Keep ascending order; late events are rare and the ring holds `threshold` items
+        position = len(times)
+        while position and times[position - 1] > epoch:
+            position -= 1
+        if len(times) == self.threshold:
+            times.popleft()
+            position -= 1
+        times.insert(position, epoch)
+        return not was_repeating and self._repeating(times)
+
+    def _raise_alert(self, alert):
+        self.alerts.append(alert)
+        return alert
+
+    def record_failure(self, timestamp, refcode, fru_code, location):
+        """Consume a failure event; returns the alerts it triggered (possibly empty)."""
+        epoch = _to_epoch(timestamp)
+        triggered = []
+        with self.lock:
+            self._observe(epoch)
+            for scope, key in (("fru", str(fru_code)), ("slot", str(location))):
+                count = self._counter(scope, key).add(epoch)
+                # Alert once when the threshold is crossed, not on every later event
+                if count is not None and self._crossed((scope, key), epoch):
+                    triggered.append(self._raise_alert(RepeatFailureAlert(
+                        scope, key, count, self.window_hours, refcode, fru_code, location, epoch
+                    )))
+        return triggered
+
+    def record_operation(self, timestamp, op_code, status):
+        """Consume a logged operation step; failed steps count toward repeat alerts."""
+        epoch = _to_epoch(timestamp)
+        with self.lock:
+            self._observe(epoch)
+            if status != "Failed":
+                return []
+            count = self._counter("operation", str(op_code)).add(epoch)
+            if count is not None and self._crossed(("operation", str(op_code)), epoch):
+                return [self._raise_alert(RepeatFailureAlert(
+                    "operation", str(op_code), count, self.window_hours, None, None, None, epoch
+                ))]
+        return []
+
+    def _failure_count(self, scope, key, now):
+        counter = self.counters.get((scope, str(key)))
+        if counter is None:
+            return 0
+        return counter.count(now)
+
+    def failure_count(self, scope, key, now=None):
+        """Failures for a key in the window ending at `now` (defaults to the current time)."""
+        now = _to_epoch(now if now is not None else datetime.now())
+        with self.lock:
+            return self._failure_count(scope, key, now)
+
+    def active_alerts(self, now=None):
+        """Alerts whose last `threshold` failures all fall within the window ending now."""
+        now = _to_epoch(now if now is not None else datetime.now())
+        active = {}
+        with self.lock:
+            for alert in self.alerts:
+                times = self.recent.get((alert.scope, alert.key), ())
+                if self._repeating(times, now):
+                    active[(alert.scope, alert.key)] = alert
+        return list(active.values())